@@ -16,8 +16,8 @@ play every other team twice before any team plays an opponent for a third time,
 As it is, the program could be used for any similar scheduling scenario outside of fantasy football,
 namely any similar round-robin style tournament. Just replace 'week' with 'round'.
 
-With a little adaptation, the core algorithm (90% of which is contained in the runScheduler() function,
-with assists from the testMatch() and setIsUnique() functions) could be used for a variety of other
+With a little adaptation, the core algorithm (90% of which is contained in the runSchedulerCore() function,
+with an assist from the testMatch() function) could be used for a variety of other
 scheduling purposes, or more broadly might find use in any task that must generate unique pairs or
 permutations from within a set.
 
@@ -30,6 +30,8 @@ that week, then C must play A and no one else). Still, the functionality is ther
 The core algorithm works roughly as follows:
 
 First of all, each team maintains a set that keeps track of which other teams it has already played.
+(For speed, this set is stored as an integer bitmask with one bit per team, so unions, subset tests and
+comparisons are single integer operations rather than operations on Python sets.)
 With that in mind:
 1) A new week is started.
 2) A random team is selected from all teams that have not yet been scheduled this week.
@@ -64,8 +66,9 @@ With that in mind:
     the possibility of successful completion. More info on the possibility of failure is below.
     
 6) If possible, a preferred match is chosen and recorded, or else a non-preferred match is chosen.
-    Each team officially adds the other to its schedule and already_played_set, and are removed from
-    unscheduled_teams and added to scheduled_teams if they have not been already.
+    Each team's played bitmask (its already_played_set) is updated to include the other, the pair's
+    indices are appended to the week's list of matchups, and both teams are removed from
+    unscheduled_teams and added to scheduled_teams.
 7) Repeat steps 2-6 until all teams are matched for the week.
 8) Repeat steps 1-7 until all weeks have been scheduled.
 
@@ -99,28 +102,21 @@ reduces the average number of resets needed by about 0.5.
 '''
 
 
+import os
 import random
-from statistics import mean
 from math import ceil
+from functools import lru_cache
+from itertools import repeat
+from collections import Counter
+from multiprocessing import Pool
 
 #global vars used for debug mode
-retries_needed = 0
-data = []
-
-class Team:
-    '''The main class defining a member of the schedule'''
-    def __init__(self, owner):            
-        self.name = owner
-        self.schedule = []
-        self.already_played_set = set()
-    def printSchedule(self):
-        print(self.name, "{", end=' ')
-        for i in range(len(self.schedule)):
-            print(self.schedule[i], ',', end=' ')
-        print("}")
+worker_rng = None       #each worker process's own random number generator
+min_pool_trials = 50    #fewer trials than this are run in-process; starting workers would cost more
 
 class WeeklySchedule:
-    '''A class which keeps track of matchups week-by-week rather than team-by-team'''
+    '''A class which keeps track of matchups week-by-week, as the text printed for each week'''
+    __slots__ = ('schedule', 'next_index')
     def __init__(self):
         self.schedule = []
         self.next_index = 0
@@ -129,46 +125,33 @@ class WeeklySchedule:
             print(f"Week {i+1}\n-------------")
             print(self.schedule[i], "\n")
         
-def testMatch(match, unscheduled_teams):
-    '''Tests if removing 'match' from 'unscheduled_teams' would result in the
-    remaining unscheduled_teams forming a subset of any other unscheduled_team's
+def iterBits(mask):
+    '''Yields the index of each set bit in 'mask', lowest first'''
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def testMatch(match_bit, unscheduled_mask, played):
+    '''Tests if removing the team at 'match_bit' from 'unscheduled_mask' would result in the
+    remaining unscheduled teams forming a subset of any other unscheduled team's
     already_played_set (with themselves added to that set)'''
-                
-    test_set = set(unscheduled_teams)
-    test_set.remove(match) #now the set of all other unscheduled teams
-    for team in test_set:
-        #construct set for comparison
-        set1 = team.already_played_set | set([team])
-        if (test_set <= set1):
-            return False
-    #if the loop completes without returning...
-    return True
 
-def setIsUnique(a_set, teams):
-    '''Returns true if no equivalent sets to 'a_set' are found in any team'''
-    for team in teams:
-        if team.already_played_set == set(a_set):
+    rest = unscheduled_mask & ~match_bit #now the set of all other unscheduled teams
+    for i in iterBits(rest):
+        #a team never plays itself, so rest is a subset of its played set (plus itself)
+        #exactly when the team's own bit is all that is left over
+        if rest & ~played[i] == 1 << i:
             return False
     #if the loop completes without returning...
     return True
-    
-
-def setMatchForTeam(team1, team2):
-    '''A convenience function for once a match has been determined'''
-    team1.schedule.append(team2.name)
-    team2.schedule.append(team1.name)
-    team1.already_played_set.add(team2)
-    team2.already_played_set.add(team1)
 
+    
 
-def getTeamByName(name, allTeams):
-    '''Convenient utility function, currently unused'''
-    return [a for a in allTeams if a.name == name].pop()
-
-def printAllSets(allTeams):
+def printAllSets(names, played):
     '''Convenient utility function, made for debugging, currently unused'''
-    for team in allTeams:
-        print(f"{team.name}:", {a.name for a in team.already_played_set})
+    for i, name in enumerate(names):
+        print(f"{name}:", {names[t] for t in iterBits(played[i])})
 
 def validatePosIntInput(val):
     '''A function that validates input as a positive integer'''
@@ -200,9 +183,6 @@ def metaWrapper():
 
 def preMain():
     '''This function handles initial input and sets up the variables needed by the Scheduler'''
-    global retries_needed
-    global data
-    data = []
 
     #WEEKS / DEBUG MODE
     print("\nWelcome to the Fantasy Football Scheduler!")
@@ -228,15 +208,24 @@ def preMain():
     if (debug_mode):
         trials = input("[DEBUG] How many trials should be performed? --> ").strip()
         trials = validatePosIntInput(trials)
-                       
-        for i in range(trials):
-            #print(names, teams, end=' ') #was used for debugging
-            retries_needed = 0
-            main(names, weeks, debug_mode)
-        print("MEAN:", mean(data))
-        print("MAX:", max(data), "(count=", len([x for x in data if x==max(data)]), ")")
-        print("MIN:", min(data), "(count=", len([x for x in data if x==min(data)]), ")")
-        print("1 or 0 (count=", len([x for x in data if x==1 or x==0]), ")")
+
+        #tally how many trials needed each number of retries (only a handful of distinct values)
+        if trials < min_pool_trials:
+            #too few trials to be worth starting worker processes, so run them here
+            rng = random.Random()
+            tally = Counter(main(names, weeks, True, rng) for i in range(trials))
+        else:
+            #trials are independent of each other, so run them across all cores
+            workers = min(os.cpu_count() or 1, trials)
+            chunksize = max(1, trials // (4 * workers))     #a few chunks per worker keeps them all busy
+            with Pool(workers, initializer=initDebugWorker) as pool:
+                tally = Counter(pool.imap_unordered(debugTrial, repeat((names, weeks), trials), chunksize))
+
+        max_retries, min_retries = max(tally), min(tally)
+        print("MEAN:", sum(r * count for r, count in tally.items()) / trials)
+        print("MAX:", max_retries, "(count=", tally[max_retries], ")")
+        print("MIN:", min_retries, "(count=", tally[min_retries], ")")
+        print("1 or 0 (count=", tally[1] + tally[0], ")")
         again = input("Run again? [Y/N] --> ").strip()
         if again == 'Y': return True
         else: return False
@@ -245,22 +234,32 @@ def preMain():
         main(names, weeks, debug_mode)
         return False
 
+def initDebugWorker():
+    '''Gives a debug mode worker process its own random number generator, seeded once'''
+    global worker_rng
+    worker_rng = random.Random()
+
+def debugTrial(args):
+    '''Runs one debug mode trial (in a worker process) and returns the number of retries it needed'''
+    names, weeks = args
+    return main(names, weeks, True, worker_rng)
     
 
-def main(names, weeks, debug_mode):
+def main(names, weeks, debug_mode, rng=None):
     '''This function is responsible for determining how many full passes of the Scheduler will be needed
-    to satisfy the given number of weeks. One full pass produces each team playing each other team once.'''
-    global retries_needed
-    global data
-    random.seed()
-
-    #initialize variables
-    teams = list(map(Team, names))
-    num_unique_matchups = len(teams)-1
-    s = WeeklySchedule()
+    to satisfy the given number of weeks. One full pass produces each team playing each other team once.
+    'rng' is the random.Random to draw from (a new one if not given; pass a seeded one to replay a run).
+    It returns the number of retries that were needed (used by debug mode).'''
+    if rng is None: rng = random.Random()
+
+    #initialize variables; teams are referred to only by their index into 'names'
+    num_teams = len(names)
+    num_unique_matchups = num_teams-1
+    schedule = []                   #week-by-week lists of (team, match) index pairs
 
     num_passes = ceil(weeks / num_unique_matchups)
     retry = True
+    retries_needed = 0
 
     #this loop handles dead ends and resets
     while retry:
@@ -268,129 +267,164 @@ def main(names, weeks, debug_mode):
         #this loop handles each full pass
         for i in range(num_passes):
             
-            for team in teams: team.already_played_set = set() #reset already_played_sets
-
-            if i < num_passes-1: #all but the last pass; a full pass is required
-                retVal = runScheduler(teams, num_unique_matchups, s)
-                if not retVal: break #if we failed, forget the rest of the loop and restart
+            played = [0] * num_teams #reset already_played_sets
 
-            elif weeks % num_unique_matchups == 0: #last pass w/ enough weeks remaining for a full pass
-                retVal = runScheduler(teams, num_unique_matchups, s)
-                if retVal: retry = False
+            if i < num_passes-1 or weeks % num_unique_matchups == 0: #a full pass is required
+                matchups = runSchedulerCore(num_teams, num_unique_matchups, played, rng)
                 
             else: #last pass w/ fewer weeks than unique matchups remaining
-                retVal = runScheduler(teams, weeks % num_unique_matchups, s)
-                if retVal: retry = False
+                matchups = runSchedulerCore(num_teams, weeks % num_unique_matchups, played, rng)
 
-        #out of the loop, if retVal is false, we have failed and must restart
-        if not retVal:
+            if matchups is None: break #if we failed, forget the rest of the loop and restart
+            schedule.extend(matchups)
+
+        #out of the loop, if matchups is None, we have failed and must restart
+        if matchups is None:
             if not debug_mode: print("dead end, retrying")
-            teams = list(map(Team, names))
-            s = WeeklySchedule()
+            schedule.clear()            #reset the schedule in place rather than rebuilding it
             retries_needed += 1
+        else:
+            retry = False
 
 
     #print(f"Retries Needed: {retries_needed}......Done")
-    data.append(retries_needed) #used for debugging only
 
     if not debug_mode:
         print("\nSuccess:\n")
-        s.printSchedule()
+        buildWeeklySchedule(names, schedule).printSchedule()
+
+    return retries_needed
                 
     
 
-def runScheduler(teams, weeks, weekly_schedule):
-    '''This function contains the core of the algorithm. It returns False if a dead end is reached'''
-    num_teams = len(teams)
-    iter_per_week = int(num_teams / 2)      #no. of matchups per week
-    s = weekly_schedule
-
-    try:
-        #this loop goes week by week
-        for w in range(weeks):
-
-            #Tasks for starting a new week
-            unscheduled_teams = teams[:]        #refresh unscheduled_teams
-            scheduled_teams = []                #empty scheduled_teams
-            s.schedule.append("")               #add a new index in the WeeklySchedule
-            already_played_or_self_size = w+1   #this does not count any matchups that are made this week
-                                                # (no. of teams) = already_played_or_self_size + yet_to_play_size
-
+def buildWeeklySchedule(names, schedule):
+    '''Translates week-by-week (team, match) index pairs into a WeeklySchedule of team names'''
+    s = WeeklySchedule()
+    for week in schedule:
+        #join once per week rather than concatenating per matchup
+        s.schedule.append("".join(f"{names[t1]} vs. {names[t2]}\n" for t1, t2 in week))
+        s.next_index += 1
+    return s
+
+@lru_cache(maxsize=None)
+def leagueConstants(num_teams):
+    '''Returns the values runSchedulerCore needs that depend only on the number of teams:
+    (matchups per week, bitmask of all teams, tuple of all team indices)'''
+    return int(num_teams / 2), (1 << num_teams) - 1, tuple(range(num_teams))
+
+def runSchedulerCore(num_teams, weeks, played, rng):
+    '''This function contains the core of the algorithm. Teams are referred to only by index, and
+    'played' holds each team's already_played_set bitmask, updated in place. All random choices are
+    drawn from 'rng', a random.Random instance. It returns a list of weeks,
+    each a list of (team, match) index pairs, or None if a dead end is reached'''
+    #no. of matchups per week, and the full set of teams as a bitmask and as indices
+    iter_per_week, all_teams_mask, all_teams = leagueConstants(num_teams)
+    matchups = []
+    randrange = rng.randrange               #local names are cheaper to look up in the loops below
+
+    #this loop goes week by week
+    for w in range(weeks):
+
+        #Tasks for starting a new week
+        unscheduled_teams = list(all_teams)         #refresh unscheduled_teams
+        unscheduled_mask = all_teams_mask           #...and its bitmask
+        pos = list(all_teams)                       #...and each team's position in unscheduled_teams
+        scheduled_teams = []                #empty scheduled_teams (teams already matched this week)
+        week = []                           #add a new week of matchups
+        already_played_or_self_size = w+1   #this does not count any matchups that are made this week
+                                            # (no. of teams) = already_played_or_self_size + yet_to_play_size
+
+
+        #this loop goes matchup by matchup
+        for i in range(iter_per_week):
+            
+            #select a random team, then remove it by moving the last team into its position
+            num_unscheduled = len(unscheduled_teams) - 1  #no. of teams left once next_team is removed
+            j = randrange(num_unscheduled + 1)
+            next_team = unscheduled_teams[j]
+            last = unscheduled_teams.pop()
+            if last != next_team:
+                unscheduled_teams[j] = last
+                pos[last] = j
+            unscheduled_mask &= ~(1 << next_team)
+
+            #determine first round of potential matches (unscheduled_set - already_played_set)
+            next_played = played[next_team]
+            matches = list(iterBits(unscheduled_mask & ~next_played))
+            if not matches:                         #next_team has played everyone left: a dead end
+                return None
+
+            if (num_unscheduled == 1):       #one team left means only one possible match
+                match = unscheduled_teams[0]        #we will not reach this point if the match is invalid...
+
+            else:                                   #...bc the list comp below would catch it first
+
+                #if there are too many teams left, a valid match for all remaining teams is guaranteed
+                if (num_unscheduled-1 <= already_played_or_self_size):
+                    matches = [a for a in matches if testMatch(1 << a, unscheduled_mask, played)] #otherwise, refine
+                    
+                    #'matches' now contains only matches that leave a valid match for all other teams
+                    if not matches:                 #every match would strand another team: a dead end
+                        return None
+                    
+                num_matches = len(matches)
+
+                #is this the first matchup this week? If so, unique sets are assured and any match will do
+                if i == 0:
+                    match = matches[randrange(num_matches)]
+                    
+                #if not, test for uniqueness
+                else:
+                    matchFound = False
+                    scheduled_sets = [played[t] for t in scheduled_teams] #fixed until the match is made
+                    next_bit = 1 << next_team           #this doesn't change between candidates
+                    #'matches' is in index order, so examine candidates in random order by drawing them
+                    #one at a time (a lazy Fisher-Yates shuffle); the first preferred one is then uniform
+                    n = num_matches
+                    while n:
+                        k = randrange(n)
+                        temp = matches[k]
+                        #construct sets for comparison
+                        set1 = next_played | (1 << temp)
+                        set2 = played[temp] | next_bit
+                        #compare sets; both must be unique among the scheduled teams' sets
+                        if (set1 not in scheduled_sets and set2 not in scheduled_sets):
+                            #...then this match is preferred
+                            match = temp
+                            matchFound = True
+                            break #nothing differentiates preferred matches, so take the first we find
+                        #not preferred: move it past the end of the candidates still to draw from
+                        n -= 1
+                        matches[k], matches[n] = matches[n], matches[k]
+
+                    #if there are no preferred matches found...
+                    if not (matchFound):
+                        #print statements used for debugging:
+                        #print(f"Forced to use non-unique set match in week {w} match {i} for team {next_team}")
+                        #print(f"matches was: {matches}")
+                        #print(f"Schedule thus far this week:\n{week}")
+                        match = matches[randrange(num_matches)] #nothing differentiates non-preferred; pick a random one
+
+
+            #Tasks once a match has been determined
+            j = pos[match]                  #same O(1) removal as for next_team
+            last = unscheduled_teams.pop()
+            if last != match:
+                unscheduled_teams[j] = last
+                pos[last] = j
+            unscheduled_mask &= ~(1 << match)
+            scheduled_teams.append(next_team)   #next_team joins only now: its own set can never equal
+            scheduled_teams.append(match)       # set1 or set2, so comparing against it was wasted work
+            played[next_team] |= 1 << match
+            played[match] |= 1 << next_team
+            week.append((next_team, match))
+
+        #on matchup for loop complete, the week is done:
+        matchups.append(week)
+
+    #on week for loop complete, report success:
+    return matchups
 
-            #this loop goes matchup by matchup
-            for i in range(iter_per_week):
-                
-                random.shuffle(unscheduled_teams)
-                next_team = unscheduled_teams.pop()     #select a random team
-                scheduled_teams.append(next_team)
-
-                #determine first round of potential matches
-                matches = [a for a in unscheduled_teams if a not in next_team.already_played_set]
-                #debug_pre_matches = [b.name for b in matches] #used for readability while debugging
-
-                if (len(unscheduled_teams) == 1):       #one team left means only one possible match
-                    match = unscheduled_teams[0]        #we will not reach this point if the match is invalid...
-                    #debug_matches = [match.name]
-
-                else:                                   #...bc the list comp below would catch it first
-
-                    #if there are too many teams left, a valid match for all remaining teams is guaranteed
-                    if (len(unscheduled_teams)-1 <= already_played_or_self_size):
-                        matches = [a for a in matches if testMatch(a, unscheduled_teams)] #otherwise, refine
-                        
-                        #'matches' now contains only matches that leave a valid match for all other teams
-                        
-                    #debug_matches = [b.name for b in matches] #used for readability while debugging
-
-               
-                    #is this the first matchup this week? If so, unique sets are assured and any match will do
-                    if i == 0:
-                        match = random.choice(matches)
-                        
-                    #if not, test for uniqueness
-                    else:
-                        matchFound = False
-                        for k in range(len(matches)):
-                            #construct sets for comparison
-                            temp = matches[k]
-                            set1 = next_team.already_played_set | set([temp])
-                            set2 = temp.already_played_set | set([next_team])
-                            #compare sets
-                            if (setIsUnique(set1, scheduled_teams) and setIsUnique(set2, scheduled_teams)):
-                                #...then this match is preferred
-                                match = temp
-                                matchFound = True
-                                break #nothing differentiates preferred matches, so take the first we find
-
-                        #if there are no preferred matches found...
-                        if not (matchFound):
-                            #print statements used for debugging:
-                            #print(f"Forced to use non-unique set match in week {s.next_index} match {i} for team {next_team.name}")
-                            #print(f"matches was: {debug_matches}  and  pre-matches was: {pre_matches}")
-                            #print(f"Schedule thus far this week:\n{s.schedule[s.next_index]}")
-                            #for t in teams: t.printSchedule()
-                            match = random.choice(matches) #nothing differentiates non-preferred; pick a random one
-
-
-                #Tasks once a match has been determined
-                #debug_match = match.name #used for readability while debugging
-                #debug_unsc_matches = [b.name for b in unscheduled_teams]
-                unscheduled_teams.remove(match)
-                scheduled_teams.append(match)
-                setMatchForTeam(next_team, match)
-                s.schedule[s.next_index] += next_team.name + " vs. " + match.name + "\n"
-
-            #on matchup for loop complete, increment week of the WeeklySchedule:
-            s.next_index += 1
-
-        #on week for loop complete, report success:
-        return True
-
-    except IndexError: #catches all dead ends
-        #print("INDEX ERROR")
-        #print(f"Schedule thus far this week:\n{s.schedule[s.next_index]}")
-        #for t in teams: t.printSchedule()
-        return False
     
     
 if __name__ == "__main__":